@@ -1,26 +1,583 @@
-from openai import OpenAI
+from openai import APIConnectionError, AsyncOpenAI, InternalServerError, OpenAI, RateLimitError
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential_jitter
+from functools import lru_cache
+from pathlib import Path
+import asyncio
+import hashlib
+import json
 import os
+import sqlite3
+import ssl
+import time
 
-_client = None
-
-def get_client():
-    """Get or create the OpenAI client, ensuring API key is loaded from environment."""
-    global _client
-    if _client is None:
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY environment variable not set")
-        _client = OpenAI(api_key=api_key)
-    return _client
-
-def summarize_text(text):
-    client = get_client()
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {"role": "system", "content": "You are a scientific research assistant."},
-            {"role": "user", "content": f"Summarize this research abstract clearly:\n\n{text}"}
-        ],
-        temperature=0.3,
+import httpx
+import numpy as np
+
+try:
+    import h2  # noqa: F401  (httpx needs it for HTTP/2)
+    _HTTP2 = True
+except ImportError:
+    _HTTP2 = False
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+MODEL = "gpt-4o-mini"
+SYSTEM_PROMPT = "You are a scientific research assistant."
+SUMMARY_PROMPT = "Summarize this research abstract clearly:\n\n"
+BATCH_SUMMARY_PROMPT = (
+    "Summarize each numbered research abstract below clearly. Respond with a JSON object "
+    'of the form {"summaries": ["...", ...]} containing exactly one summary string per '
+    "abstract, in the same order.\n\n"
+)
+# Input-token budget for one batched request; abstracts are grouped so a batch
+# stays under it (an abstract over the budget on its own goes alone)
+SUMMARY_BATCH_TOKENS = 2000
+# Seconds between status checks while waiting on an OpenAI Batch API job
+BATCH_POLL_INTERVAL = 30
+# Cap on each summary's length, so a runaway completion can't inflate cost or
+# hold a concurrency slot for long
+SUMMARY_MAX_TOKENS = 400
+
+# Summaries are cached on disk so re-running the pipeline doesn't pay for
+# the same abstract twice. Delete the directory to invalidate.
+CACHE_DIR = Path(__file__).resolve().parent / "cache"
+
+# Near-duplicate abstracts (arXiv revisions etc.) reuse a cached summary when
+# their embeddings are at least this cosine-similar.
+EMBEDDING_MODEL = "text-embedding-3-small"
+SEMANTIC_CACHE_THRESHOLD = 0.95
+
+# One keep-alive pool per client so repeated calls reuse the TLS connection
+# instead of handshaking each time. The pool is sized well above the number of
+# concurrent requests so bursts don't wait on (or time out for) a connection.
+HTTP_MAX_CONNECTIONS = 256
+# Passed to the OpenAI clients, which apply it to every request (a client-level
+# timeout replaces the httpx one, so this is the only place it is set)
+REQUEST_TIMEOUT = httpx.Timeout(30.0, connect=10.0)
+# Building an SSL context is most of the cost of creating a client, so every
+# client shares this one.
+_shared_ssl = ssl.create_default_context()
+
+# Clients are cached per API key (and pool size, for the async ones)
+_clients = {}
+_async_clients = {}
+_cache_db = None
+_semantic_embeddings = None  # (N, D) float32 array of unit vectors
+_semantic_summaries = None   # N summaries, aligned with _semantic_embeddings
+
+def _get_api_key():
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise ValueError("OPENAI_API_KEY environment variable not set")
+    return api_key
+
+def _http_limits(max_connections):
+    return httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max(1, max_connections // 2),
+        keepalive_expiry=30.0,
     )
-    return response.choices[0].message.content  
\ No newline at end of file
+
+def get_sync_client():
+    """Get or create the OpenAI client for the API key in the environment."""
+    api_key = _get_api_key()
+    client = _clients.get(api_key)
+    if client is None:
+        http_client = httpx.Client(http2=_HTTP2, limits=_http_limits(HTTP_MAX_CONNECTIONS),
+                                   verify=_shared_ssl)
+        # max_retries=0: the tenacity decorator below is the only retry layer
+        client = _clients[api_key] = OpenAI(api_key=api_key, http_client=http_client, timeout=REQUEST_TIMEOUT,
+                                             max_retries=0)
+    return client
+
+get_client = get_sync_client
+
+def get_async_client(max_connections=None):
+    """
+    Get or create the AsyncOpenAI client used for concurrent requests.
+
+    Args:
+        max_connections: Size of the connection pool. If None, uses HTTP_MAX_CONNECTIONS
+    """
+    if max_connections is None:
+        max_connections = HTTP_MAX_CONNECTIONS
+    key = (_get_api_key(), max_connections)
+    client = _async_clients.get(key)
+    if client is None:
+        http_client = httpx.AsyncClient(http2=_HTTP2, limits=_http_limits(max_connections),
+                                        verify=_shared_ssl)
+        client = _async_clients[key] = AsyncOpenAI(api_key=key[0], http_client=http_client,
+                                                        timeout=REQUEST_TIMEOUT, max_retries=0)
+    return client
+
+async def close_async_client():
+    """Close the AsyncOpenAI clients; their connections are tied to the running event loop."""
+    while _async_clients:
+        _, client = _async_clients.popitem()
+        await client.close()
+
+def _is_transient_error(error):
+    # Dropped connections, timeouts and 5xx responses are worth retrying.
+    # insufficient_quota is also a 429, but waiting will not fix it
+    if isinstance(error, (APIConnectionError, InternalServerError)):
+        return True
+    return isinstance(error, RateLimitError) and getattr(error, "code", None) != "insufficient_quota"
+
+# Jitter keeps concurrent requests that fail together from retrying in lockstep
+_backoff = wait_exponential_jitter(initial=1, max=60)
+
+def _wait_for_retry(retry_state):
+    """Wait as long as the server's Retry-After header asks, else back off exponentially."""
+    error = retry_state.outcome.exception()
+    response = getattr(error, "response", None)
+    if response is not None:
+        retry_after = response.headers.get("retry-after")
+        if retry_after:
+            try:
+                return min(float(retry_after), 60.0)
+            except ValueError:
+                pass
+    return _backoff(retry_state)
+
+# The clients are created with max_retries=0, so this is the only retry layer:
+# one call makes at most 6 HTTP attempts.
+_retry_transient = retry(
+    retry=retry_if_exception(_is_transient_error),
+    wait=_wait_for_retry,
+    stop=stop_after_attempt(6),
+    reraise=True,
+)
+
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        return tiktoken.encoding_for_model(MODEL)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+def estimate_tokens(text):
+    """Count the tokens in `text`, or estimate ~4 characters per token if tiktoken isn't installed."""
+    if tiktoken is None:
+        return len(text) // 4 + 1
+    return len(_encoding().encode(text))
+
+class RateLimiter:
+    """
+    Token buckets for requests per minute and tokens per minute.
+
+    Both buckets start full and refill continuously at their per-minute rate;
+    acquire() waits until there is room for one more request of the given
+    size. Waiters are served in order so a large request isn't starved.
+
+    Args:
+        rpm: Requests allowed per minute, or None for no limit
+        tpm: Tokens (prompt + completion) allowed per minute, or None for no limit
+    """
+
+    def __init__(self, rpm=None, tpm=None):
+        self.rpm = float(rpm) if rpm else float("inf")
+        self.tpm = float(tpm) if tpm else float("inf")
+        self._requests = self.rpm
+        self._tokens = self.tpm
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60)
+        self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60)
+
+    async def acquire(self, tokens=0):
+        # A request larger than the whole bucket could otherwise never run
+        tokens = min(tokens, self.tpm)
+        async with self._lock:
+            while True:
+                self._refill()
+                waits = []
+                if self._requests < 1:
+                    waits.append((1 - self._requests) * 60 / self.rpm)
+                if self._tokens < tokens:
+                    waits.append((tokens - self._tokens) * 60 / self.tpm)
+                if not waits:
+                    self._requests -= 1
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep(max(waits))
+
+def _get_cache():
+    global _cache_db
+    if _cache_db is None:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        _cache_db = sqlite3.connect(CACHE_DIR / "summaries.sqlite")
+        _cache_db.execute("CREATE TABLE IF NOT EXISTS summaries (key TEXT PRIMARY KEY, summary TEXT)")
+        _cache_db.execute("CREATE TABLE IF NOT EXISTS semantic (namespace TEXT, embedding BLOB, summary TEXT)")
+    return _cache_db
+
+def _cache_key(text, prompt=SUMMARY_PROMPT):
+    # Keyed on the prompt that produced the summary, so batched summaries
+    # (BATCH_SUMMARY_PROMPT) never stand in for single ones or outlive an edit
+    return hashlib.sha256(f"{MODEL}|{SYSTEM_PROMPT}|{prompt}|{text}".encode("utf-8")).hexdigest()
+
+def _cache_get(key):
+    row = _get_cache().execute("SELECT summary FROM summaries WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+def _cache_put(key, summary):
+    db = _get_cache()
+    with db:
+        db.execute("INSERT OR REPLACE INTO summaries (key, summary) VALUES (?, ?)", (key, summary))
+
+def _semantic_namespace():
+    # The summaries depend on the chat model and prompts as well as the
+    # embedding model, so each combination gets its own rows.
+    return hashlib.sha256(
+        f"{MODEL}|{SYSTEM_PROMPT}|{SUMMARY_PROMPT}|{EMBEDDING_MODEL}".encode("utf-8")
+    ).hexdigest()[:16]
+
+def _load_semantic_cache():
+    global _semantic_embeddings, _semantic_summaries
+    if _semantic_summaries is not None:
+        return
+    rows = _get_cache().execute(
+        "SELECT embedding, summary FROM semantic WHERE namespace = ? ORDER BY rowid", (_semantic_namespace(),)
+    ).fetchall()
+    if rows:
+        _semantic_embeddings = np.stack([np.frombuffer(embedding, dtype=np.float32) for embedding, _ in rows])
+        _semantic_summaries = [summary for _, summary in rows]
+    else:
+        _semantic_embeddings = None
+        _semantic_summaries = []
+
+def _unit_vector(embedding):
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+def _semantic_lookup(vector):
+    _load_semantic_cache()
+    if not _semantic_summaries:
+        return None
+    similarities = _semantic_embeddings @ vector
+    best = int(np.argmax(similarities))
+    if similarities[best] >= SEMANTIC_CACHE_THRESHOLD:
+        return _semantic_summaries[best]
+    return None
+
+def _semantic_store(vector, summary):
+    global _semantic_embeddings
+    _load_semantic_cache()
+    if _semantic_summaries:
+        _semantic_embeddings = np.vstack([_semantic_embeddings, vector])
+    else:
+        _semantic_embeddings = vector[np.newaxis, :]
+    _semantic_summaries.append(summary)
+
+    # One row per entry: each store is a single atomic insert, not a rewrite
+    # of every embedding so far, and a crash can't leave a torn file behind
+    db = _get_cache()
+    with db:
+        db.execute(
+            "INSERT INTO semantic (namespace, embedding, summary) VALUES (?, ?, ?)",
+            (_semantic_namespace(), np.asarray(vector, dtype=np.float32).tobytes(), summary),
+        )
+
+@_retry_transient
+def _request_embeddings(texts):
+    response = get_sync_client().embeddings.create(model=EMBEDDING_MODEL, input=list(texts))
+    return [_unit_vector(item.embedding) for item in sorted(response.data, key=lambda item: item.index)]
+
+@_retry_transient
+async def _request_embeddings_async(texts, client=None):
+    response = await (client or get_async_client()).embeddings.create(model=EMBEDDING_MODEL, input=list(texts))
+    return [_unit_vector(item.embedding) for item in sorted(response.data, key=lambda item: item.index)]
+
+def _summary_messages(text):
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": f"{SUMMARY_PROMPT}{text}"}
+    ]
+
+def _summary_request(text, max_tokens=SUMMARY_MAX_TOKENS):
+    """Chat completion arguments for summarizing one abstract."""
+    return {
+        "model": MODEL,
+        "messages": _summary_messages(text),
+        "temperature": 0.3,
+        "max_tokens": max_tokens,
+    }
+
+def _batch_summary_messages(texts):
+    numbered = "\n\n".join(f"[{i}]\n{text}" for i, text in enumerate(texts, 1))
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": f"{BATCH_SUMMARY_PROMPT}{numbered}"}
+    ]
+
+def _batch_summary_request(texts, max_tokens=SUMMARY_MAX_TOKENS):
+    """Chat completion arguments for summarizing several abstracts; `max_tokens` is per abstract."""
+    return {
+        "model": MODEL,
+        "messages": _batch_summary_messages(texts),
+        "temperature": 0.3,
+        "max_tokens": max_tokens * len(texts),
+        "response_format": {"type": "json_object"},
+    }
+
+def _parse_batch_summaries(response, expected):
+    # Raises ValueError (json.JSONDecodeError included) on anything unusable,
+    # e.g. JSON cut off at the max_tokens cap
+    payload = json.loads(response.choices[0].message.content or "")
+    summaries = payload.get("summaries") if isinstance(payload, dict) else None
+    if not isinstance(summaries, list) or len(summaries) != expected:
+        got = len(summaries) if isinstance(summaries, list) else 0
+        raise ValueError(f"Expected {expected} summaries in batched response, got {got}")
+    return [str(summary) for summary in summaries]
+
+@_retry_transient
+def _request_summary(text, max_tokens=SUMMARY_MAX_TOKENS):
+    client = get_sync_client()
+    response = client.chat.completions.create(**_summary_request(text, max_tokens))
+    return response.choices[0].message.content
+
+# The async request helpers take the limiter themselves, inside the retry
+# decorator, so every attempt (retries after a 429, 5xx or timeout included)
+# is counted against the RPM/TPM budget.
+@_retry_transient
+async def _request_summary_async(text, client=None, max_tokens=SUMMARY_MAX_TOKENS, limiter=None):
+    if limiter is not None:
+        await limiter.acquire(estimate_tokens(text) + max_tokens)
+    client = client or get_async_client()
+    response = await client.chat.completions.create(**_summary_request(text, max_tokens))
+    return response.choices[0].message.content
+
+@_retry_transient
+def _request_summaries(texts, max_tokens=SUMMARY_MAX_TOKENS):
+    client = get_sync_client()
+    response = client.chat.completions.create(**_batch_summary_request(texts, max_tokens))
+    return _parse_batch_summaries(response, len(texts))
+
+@_retry_transient
+async def _request_summaries_async(texts, client=None, max_tokens=SUMMARY_MAX_TOKENS, limiter=None):
+    if limiter is not None:
+        await limiter.acquire(sum(estimate_tokens(text) + max_tokens for text in texts))
+    client = client or get_async_client()
+    response = await client.chat.completions.create(**_batch_summary_request(texts, max_tokens))
+    return _parse_batch_summaries(response, len(texts))
+
+def summarize_text(text, max_tokens=SUMMARY_MAX_TOKENS):
+    key = _cache_key(text)
+    summary = _cache_get(key)
+    if summary is not None:
+        return summary
+
+    vector = _request_embeddings([text])[0]
+    summary = _semantic_lookup(vector)
+    if summary is None:
+        summary = _request_summary(text, max_tokens)
+        _semantic_store(vector, summary)
+    _cache_put(key, summary)
+    return summary
+
+async def summarize_text_async(text, client=None, max_tokens=SUMMARY_MAX_TOKENS, limiter=None):
+    """
+    Async version of summarize_text, for running many summaries concurrently.
+
+    Args:
+        text: Abstract to summarize
+        client: AsyncOpenAI client to use. If None, uses the shared one from get_async_client()
+        max_tokens: Upper bound on the summary's length in tokens
+        limiter: RateLimiter to wait on before sending each chat request attempt
+    """
+    key = _cache_key(text)
+    summary = _cache_get(key)
+    if summary is not None:
+        return summary
+
+    vector = (await _request_embeddings_async([text], client))[0]
+    summary = _semantic_lookup(vector)
+    if summary is None:
+        summary = await _request_summary_async(text, client, max_tokens, limiter)
+        _semantic_store(vector, summary)
+    _cache_put(key, summary)
+    return summary
+
+def _batch_cache_get(text):
+    # A summary of the abstract on its own is as good as a batched one
+    return _cache_get(_cache_key(text, BATCH_SUMMARY_PROMPT)) or _cache_get(_cache_key(text))
+
+def _semantic_fill(batch, summaries, vectors):
+    """Fill gaps in `summaries` from the semantic cache; return the indices still missing."""
+    missing = []
+    for i, vector in vectors.items():
+        summary = _semantic_lookup(vector)
+        if summary is None:
+            missing.append(i)
+        else:
+            summaries[i] = summary
+            _cache_put(_cache_key(batch[i]), summary)
+    return missing
+
+def _store_summaries(batch, summaries, vectors, missing, results, prompt):
+    for i, summary in zip(missing, results):
+        summaries[i] = summary
+        # The semantic cache's entries are keyed on SUMMARY_PROMPT, so only
+        # single-abstract summaries go into it
+        if prompt == SUMMARY_PROMPT:
+            _semantic_store(vectors[i], summary)
+        _cache_put(_cache_key(batch[i], prompt), summary)
+
+def summarize_texts(batch, max_tokens=SUMMARY_MAX_TOKENS):
+    """
+    Summarize several abstracts with a single chat completion.
+
+    Cached abstracts are not sent; the rest are numbered in one prompt and
+    the model returns a JSON list of summaries. Keep a batch's abstracts within
+    SUMMARY_BATCH_TOKENS input tokens so the request stays modest; the
+    completion is capped at `max_tokens` per abstract. If the reply doesn't
+    hold one summary per abstract, they are summarized one request each.
+
+    Returns:
+        list: One summary per abstract, in the same order as `batch`
+    """
+    summaries = [_batch_cache_get(text) for text in batch]
+    uncached = [i for i, summary in enumerate(summaries) if summary is None]
+    if not uncached:
+        return summaries
+
+    vectors = dict(zip(uncached, _request_embeddings([batch[i] for i in uncached])))
+    missing = _semantic_fill(batch, summaries, vectors)
+    if missing:
+        try:
+            results = _request_summaries([batch[i] for i in missing], max_tokens)
+            prompt = BATCH_SUMMARY_PROMPT
+        except ValueError:
+            # Wrong count or truncated JSON: summarize these abstracts one by one
+            results = [_request_summary(batch[i], max_tokens) for i in missing]
+            prompt = SUMMARY_PROMPT
+        _store_summaries(batch, summaries, vectors, missing, results, prompt)
+    return summaries
+
+async def summarize_texts_async(batch, client=None, max_tokens=SUMMARY_MAX_TOKENS, limiter=None):
+    """Async version of summarize_texts; `client` and `limiter` are as for summarize_text_async."""
+    summaries = [_batch_cache_get(text) for text in batch]
+    uncached = [i for i, summary in enumerate(summaries) if summary is None]
+    if not uncached:
+        return summaries
+
+    vectors = dict(zip(uncached, await _request_embeddings_async([batch[i] for i in uncached], client)))
+    missing = _semantic_fill(batch, summaries, vectors)
+    if missing:
+        try:
+            results = await _request_summaries_async([batch[i] for i in missing], client, max_tokens, limiter)
+            prompt = BATCH_SUMMARY_PROMPT
+        except ValueError:
+            # Wrong count or truncated JSON: summarize these abstracts one by
+            # one, sequentially so the group still holds a single concurrency slot
+            results = []
+            for i in missing:
+                results.append(await _request_summary_async(batch[i], client, max_tokens, limiter))
+            prompt = SUMMARY_PROMPT
+        _store_summaries(batch, summaries, vectors, missing, results, prompt)
+    return summaries
+
+def _run_summary_batch(texts, poll_interval):
+    """
+    Upload, wait on and download one Batch API job summarizing `texts`.
+
+    This touches only the network, never the SQLite cache, so it is safe to
+    run in a worker thread.
+
+    Returns:
+        dict: Summary for each index into `texts` whose request succeeded
+    """
+    lines = [
+        json.dumps({
+            "custom_id": f"paper-{i}",
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": _summary_request(text),
+        })
+        for i, text in enumerate(texts)
+    ]
+    client = get_sync_client()
+    input_file = client.files.create(
+        file=("summaries.jsonl", ("\n".join(lines) + "\n").encode("utf-8")),
+        purpose="batch",
+    )
+    batch = client.batches.create(
+        input_file_id=input_file.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h",
+    )
+    while batch.status not in ("completed", "failed", "expired", "cancelled"):
+        time.sleep(poll_interval)
+        batch = client.batches.retrieve(batch.id)
+
+    # Expired and cancelled jobs still return whatever requests finished
+    if not batch.output_file_id:
+        raise RuntimeError(f"Batch {batch.id} ended with status '{batch.status}' and no output")
+    results = {}
+    for line in client.files.content(batch.output_file_id).text.splitlines():
+        if not line.strip():
+            continue
+        result = json.loads(line)
+        response = result.get("response")
+        if not response or response.get("status_code") != 200:
+            continue
+        results[int(result["custom_id"].split("-", 1)[1])] = response["body"]["choices"][0]["message"]["content"]
+    return results
+
+def _batch_cache_lookup(texts):
+    keys = [_cache_key(text) for text in texts]
+    summaries = [_cache_get(key) for key in keys]
+    uncached = [i for i, summary in enumerate(summaries) if summary is None]
+    return keys, summaries, uncached
+
+def _batch_cache_fill(keys, summaries, uncached, results):
+    for j, summary in results.items():
+        i = uncached[j]
+        summaries[i] = summary
+        _cache_put(keys[i], summary)
+    return summaries
+
+def submit_batch_summaries(texts, poll_interval=BATCH_POLL_INTERVAL):
+    """
+    Summarize abstracts through the OpenAI Batch API.
+
+    Batch jobs cost half as much as regular requests and don't count against
+    the per-minute rate limits, but OpenAI may take up to 24 hours to finish
+    them, so this suits an offline run over the whole archive. Abstracts
+    already in the cache are not sent.
+
+    Args:
+        texts: Abstracts to summarize
+        poll_interval: Seconds to wait between job status checks
+
+    Returns:
+        list: One summary per abstract, in the same order as `texts`; None
+        where that abstract's request failed
+    """
+    keys, summaries, uncached = _batch_cache_lookup(texts)
+    if not uncached:
+        return summaries
+    results = _run_summary_batch([texts[i] for i in uncached], poll_interval)
+    return _batch_cache_fill(keys, summaries, uncached, results)
+
+async def submit_batch_summaries_async(texts, poll_interval=BATCH_POLL_INTERVAL):
+    """
+    Async version of submit_batch_summaries.
+
+    The cache is read and written on the event loop's thread (SQLite
+    connections can't be shared across threads); only the job itself waits
+    in a worker thread.
+    """
+    keys, summaries, uncached = _batch_cache_lookup(texts)
+    if not uncached:
+        return summaries
+    results = await asyncio.to_thread(_run_summary_batch, [texts[i] for i in uncached], poll_interval)
+    return _batch_cache_fill(keys, summaries, uncached, results)
@@ -1,38 +1,108 @@
 from pathlib import Path
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+import mmap
+import os
 import re
 
+try:
+    import fitz  # PyMuPDF: C-level text extraction, much faster than PyPDF2
+except ImportError:
+    fitz = None
+
 try:
     from PyPDF2 import PdfReader
 except ImportError:
     PdfReader = None
 
+try:
+    import ahocorasick  # pyahocorasick: finds every keyword in one pass over the text
+except ImportError:
+    ahocorasick = None
+
+
+# Scanned/image-only PDFs yield almost no text but still cost a full decode of
+# every page image, so they are skipped if the sampled pages hold less than this.
+SCANNED_PDF_MIN_CHARS = 150
+
+
+def _sample_page_indices(page_count):
+    """First, middle and last page, without repeats for short documents."""
+    if page_count == 0:
+        return []
+    return sorted({0, page_count // 2, page_count - 1})
+
 
 def convert_pdf_to_txt_file(pdf_path, output_path):
     """
     Convert a PDF file into a text file.
+
+    A few pages are sampled first; if they contain hardly any text the PDF is
+    treated as scanned and skipped without extracting the rest.
+
+    Returns:
+        tuple: (pdf_path, status) where status is "converted", "skipped" or "error"
     """
-    if PdfReader is None:
-        print("Error: PyPDF2 is not installed. Please install it with: pip install PyPDF2")
-        return
+    if fitz is None and PdfReader is None:
+        print("Error: no PDF library is installed. Please install one with: pip install pymupdf")
+        return pdf_path, "error"
+    doc = None
     try:
-        reader = PdfReader(str(pdf_path))
-        text = ""
-        for page in reader.pages:
-            text += (page.extract_text() or "") + "\n"
+        if fitz is not None:
+            doc = fitz.open(str(pdf_path))
+            pages = doc
+            extract = lambda page: page.get_text("text")
+        else:
+            pages = PdfReader(str(pdf_path)).pages
+            extract = lambda page: page.extract_text() or ""
+
+        sampled = {i: extract(pages[i]) for i in _sample_page_indices(len(pages))}
+        if sum(len(text.strip()) for text in sampled.values()) < SCANNED_PDF_MIN_CHARS:
+            print(f"Skipped (no text layer, likely scanned): {pdf_path}")
+            return pdf_path, "skipped"
+
+        # Write each page as soon as it is extracted instead of building one
+        # big string, so memory stays flat regardless of page count.
         with open(output_path, "w", encoding="utf-8") as f:
-            f.write(text)
+            for i, page in enumerate(pages):
+                text = sampled.get(i)
+                f.write(text if text is not None else extract(page))
+                f.write("\n")
         print(f"Converted: {pdf_path} -> {output_path}")
+        return pdf_path, "converted"
     except Exception as e:
         print(f"Error converting {pdf_path}: {e}")
+        return pdf_path, "error"
+    finally:
+        if doc is not None:
+            doc.close()
+
 
+def _convert_one(task):
+    """Unpack a (pdf_path, output_path) task for ProcessPoolExecutor.map."""
+    return convert_pdf_to_txt_file(*task)
+
+
+def convert_all_pdfs(max_workers=None):
+    """
+    Convert every PDF in abstracts/pdfs into abstracts/txt.
 
-def convert_all_pdfs():
+    Text extraction is CPU-bound, so files are converted in parallel worker
+    processes (threads would serialize on the GIL).
+
+    Args:
+        max_workers: Number of worker processes. If None, uses min(cpu_count, 4)
+
+    Returns:
+        list: (pdf_path, status) tuples, in sorted filename order
+    """
     base_dir = Path(__file__).resolve().parent
     pdf_folder = base_dir / "abstracts" / "pdfs"
     txt_folder = base_dir / "abstracts" / "txt"
     txt_folder.mkdir(parents=True, exist_ok=True)
 
+    tasks = []
     for pdf_path in sorted(pdf_folder.glob("*.pdf")):
         if pdf_path.is_file():
             filename = pdf_path.name
@@ -40,7 +110,94 @@ def convert_all_pdfs():
             txt_filename = filename.replace(".pdf", ".txt")
             output_path = txt_folder / txt_filename
 
-            convert_pdf_to_txt_file(pdf_path, output_path)
+            tasks.append((pdf_path, output_path))
+
+    if not tasks:
+        return []
+
+    if max_workers is None:
+        max_workers = min(os.cpu_count() or 1, 4)
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(_convert_one, tasks))
+
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def _normalize_space(s):
+    return _WHITESPACE_RE.sub(" ", s).strip()
+
+
+# Header lines of the labeled format ("Title: ...") in Paper.load_paper
+_LABEL_RE = re.compile(r'^[ \t]*(Title|Authors|Category|Abstract):[ \t]*(.*)$', re.MULTILINE)
+
+# Patterns used when parsing PDF-extracted text in Paper.load_paper
+_HEADER_RE = re.compile(r"preprint|doi:|accepted|received")
+_AFFILIATION_RE = re.compile(r"department|university|institute|school")
+_INTRO_RE = re.compile(r'^\d+\s+(INTRODUCTION|Introduction|INTRO)')
+_ABSTRACT_LABEL_RE = re.compile(r'abstract[:\s]*', re.IGNORECASE)
+_ABSTRACT_END_RE = re.compile(r'\d+\s+(?:INTRODUCTION|Introduction|INTRO)|Keywords|Key words', re.IGNORECASE)
+_EMAIL_RE = re.compile(r'\S+@\S+')
+_ORCID_RE = re.compile(r'ORCID:\s*\d+[-\d\s]*')
+_AUTHOR_SPLIT_RE = re.compile(r',\s*and\s*|,\s*|\s+and\s+')
+_AUTHOR_MARKS_RE = re.compile(r'[\d★*]')
+# The lookahead makes the label give back one character of [:\s] if nothing follows it
+_KEYWORDS_LABEL_RE = re.compile(r'(?:Keywords|Key words)[:\s]*(?=.)', re.IGNORECASE | re.DOTALL)
+_KEYWORDS_END_RE = re.compile(r'\d+\s+(?:INTRODUCTION|Introduction|INTRO)', re.IGNORECASE)
+
+
+@lru_cache(maxsize=32)
+def _keyword_automaton(keywords):
+    """
+    Build (once per keyword tuple) an Aho-Corasick automaton over the keywords.
+    """
+    automaton = ahocorasick.Automaton()
+    for keyword in keywords:
+        if keyword:
+            automaton.add_word(keyword, keyword)
+    automaton.make_automaton()
+    return automaton
+
+
+@lru_cache(maxsize=32)
+def _minimal_keywords(keywords):
+    """
+    Drop keywords that contain a shorter keyword from the same tuple.
+
+    Wherever "stars" or "starburst" occurs, "star" does too, so they can't
+    change whether *any* keyword matches; only the shortest forms need checking.
+    """
+    minimal = []
+    for keyword in sorted(set(keywords), key=len):
+        if not any(shorter in keyword for shorter in minimal):
+            minimal.append(keyword)
+    return tuple(minimal)
+
+
+def _any_keyword_in(search_text, keywords):
+    """
+    Check whether any of `keywords` occurs in `search_text` as a substring.
+    """
+    if ahocorasick is None:
+        return any(keyword in search_text for keyword in keywords)
+    if "" in keywords:
+        return True
+    automaton = _keyword_automaton(tuple(keywords))
+    return len(automaton) > 0 and next(automaton.iter(search_text), None) is not None
+
+
+def _keywords_in(search_text, keywords):
+    """
+    Get the set of `keywords` that occur in `search_text` as substrings.
+    """
+    if ahocorasick is None:
+        return {keyword for keyword in keywords if keyword in search_text}
+    automaton = _keyword_automaton(tuple(keywords))
+    found = {keyword for _, keyword in automaton.iter(search_text)} if len(automaton) else set()
+    if "" in keywords:
+        found.add("")
+    return found
 
 
 class Paper:
@@ -55,14 +212,24 @@ class Paper:
         self.authors = []
         self.category = ""
         self.abstract = ""
+        self._search_text_lower = ""
 
         self.load_paper()
 
     def load_paper(self):
         """Reads file and extracts metadata."""
         try:
-            with open(self.filepath, 'r', encoding="utf-8") as f:
-                content = f.read()
+            # Decode straight out of a read-only mapping of the file, without
+            # reading it into an intermediate bytes object first
+            with open(self.filepath, 'rb') as f:
+                if os.fstat(f.fileno()).st_size:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        content = str(mm, "utf-8", "replace")
+                else:
+                    content = ""  # empty files can't be mapped
+            if "\r" in content:
+                # Match text-mode reading, which translates \r\n and \r to \n
+                content = content.replace("\r\n", "\n").replace("\r", "\n")
 
             lines = content.split("\n")
             
@@ -70,52 +237,79 @@ class Paper:
             has_labels = any(line.strip().startswith("Title:") for line in lines[:20])
             
             if has_labels:
-                # Original labeled format
-                for line in lines:
-                    line = line.strip()
-
-                    if line.startswith("Title:"):
-                        self.title = line.replace("Title:", "").strip()
-
-                    elif line.startswith("Authors:"):
-                        authors_str = line.replace("Authors:", "").strip()
-                        self.authors = [a.strip() for a in authors_str.split(",") if a.strip()]
-
-                    elif line.startswith("Category:"):
-                        self.category = line.replace("Category:", "").strip()
-
-                # Extract abstract safely
-                if "Abstract:" in content:
-                    self.abstract = content.split("Abstract:")[1].strip()
-                else:
-                    self.abstract = ""
+                # Original labeled format: one regex scan finds the header lines
+                for match in _LABEL_RE.finditer(content):
+                    label, value = match.groups()
+                    if label == "Title":
+                        self.title = value.strip()
+                    elif label == "Authors":
+                        self.authors = [a.strip() for a in value.split(",") if a.strip()]
+                    elif label == "Category":
+                        self.category = value.strip()
+                    else:
+                        # The abstract runs from its label to the end of the file
+                        self.abstract = content[match.start(2):].strip()
+                        break
             else:
-                # PDF-extracted format: parse title, authors, abstract from raw text
-                # Find title (usually early lines, before authors)
+                # PDF-extracted format: parse title, authors, abstract from raw text.
+                # One pass over the lines; each line is offered to whichever of the
+                # title / author / abstract scanners is still active, and the loop
+                # stops as soon as all three are done (usually at the introduction).
                 title_lines = []
+                title_done = False
                 author_start_idx = None
-                
-                for i, line in enumerate(lines[:20]):  # Check first 20 lines
+                author_lines = []
+                authors_done = False
+                abstract_start = None
+                abstract_lines = []
+                abstract_done = False
+
+                for i, line in enumerate(lines):
                     stripped = line.strip()
-                    # Skip header lines (journal names, dates, etc.)
-                    if not stripped or len(stripped) < 10:
-                        continue
-                    # Skip lines that look like headers (all caps, dates, etc.)
-                    if stripped.isupper() or any(x in stripped.lower() for x in ['preprint', 'doi:', 'accepted', 'received']):
-                        continue
-                    # Title is usually before authors (which have numbers/superscripts)
-                    if not any(char.isdigit() for char in stripped[:5]) and not stripped.startswith('*'):
-                        if author_start_idx is None:
-                            title_lines.append(stripped)
-                        else:
-                            break
-                    else:
-                        # Found author line (has numbers or starts with *)
-                        if author_start_idx is None:
-                            author_start_idx = i
-                            # Join accumulated title lines
-                            self.title = " ".join(title_lines).strip()
-                            break
+
+                    # Title is usually in the first 20 lines, before authors (which have numbers/superscripts)
+                    if not title_done:
+                        if i >= 20:
+                            title_done = True
+                        # Skip blank, short, and header lines (journal names, dates, etc.)
+                        elif len(stripped) >= 10 and not stripped.isupper() and not _HEADER_RE.search(stripped.lower()):
+                            if not any(char.isdigit() for char in stripped[:5]) and not stripped.startswith('*'):
+                                title_lines.append(stripped)
+                            else:
+                                # Found author line (has numbers or starts with *)
+                                author_start_idx = i
+                                self.title = " ".join(title_lines).strip()
+                                title_done = True
+
+                    # Authors: up to 10 lines starting at the first author line
+                    if author_start_idx is not None and not authors_done:
+                        if i >= author_start_idx + 10 or not stripped:
+                            authors_done = True
+                        # Author lines typically have numbers or email markers
+                        elif any(char.isdigit() for char in stripped[:10]) or '@' in stripped or '*' in stripped:
+                            author_lines.append(stripped)
+                        elif stripped.startswith('1') or stripped.startswith('*'):
+                            author_lines.append(stripped)
+                        # Stop at affiliations
+                        elif _AFFILIATION_RE.search(stripped.lower()):
+                            authors_done = True
+
+                    # Abstract starts after an "ABSTRACT" heading and continues until
+                    # the introduction or keywords section
+                    if abstract_start is None:
+                        heading = stripped.upper()
+                        if heading == "ABSTRACT" or (heading.startswith("ABSTRACT") and len(heading) < 20):
+                            abstract_start = i + 1
+                    elif not abstract_done:
+                        if _INTRO_RE.match(stripped) or \
+                           stripped.upper().startswith('KEY WORDS') or \
+                           stripped.upper().startswith('KEYWORDS'):
+                            abstract_done = True
+                        elif stripped:
+                            abstract_lines.append(stripped)
+
+                    if title_done and (author_start_idx is None or authors_done) and abstract_done:
+                        break
                 
                 # If title not found yet, try simpler approach
                 if not self.title and len(lines) > 2:
@@ -131,75 +325,50 @@ class Paper:
                     if potential_title:
                         self.title = " ".join(potential_title).strip()
                 
-                # Extract authors (lines with numbers/superscripts after title)
-                author_lines = []
-                if author_start_idx is not None:
-                    for i in range(author_start_idx, min(author_start_idx + 10, len(lines))):
-                        stripped = lines[i].strip()
-                        if not stripped:
-                            break
-                        # Author lines typically have numbers or email markers
-                        if any(char.isdigit() for char in stripped[:10]) or '@' in stripped or '*' in stripped:
-                            author_lines.append(stripped)
-                        elif stripped.startswith('1') or stripped.startswith('*'):
-                            author_lines.append(stripped)
-                        else:
-                            # Stop at affiliations
-                            if any(x in stripped.lower() for x in ['department', 'university', 'institute', 'school']):
-                                break
-                
                 # Parse authors from author lines
                 if author_lines:
                     # Extract author names (before numbers/email)
                     authors_text = " ".join(author_lines)
                     # Split by common delimiters
                     # Remove email addresses and ORCID
-                    authors_text = re.sub(r'\S+@\S+', '', authors_text)
-                    authors_text = re.sub(r'ORCID:\s*\d+[-\d\s]*', '', authors_text)
+                    authors_text = _EMAIL_RE.sub('', authors_text)
+                    authors_text = _ORCID_RE.sub('', authors_text)
                     # Split by commas and 'and'
-                    author_parts = re.split(r',\s*and\s*|,\s*|\s+and\s+', authors_text)
+                    author_parts = _AUTHOR_SPLIT_RE.split(authors_text)
                     self.authors = [a.strip() for a in author_parts if a.strip() and len(a.strip()) > 2]
                     # Clean up author names (remove numbers, asterisks)
-                    self.authors = [re.sub(r'[\d★*]', '', a).strip() for a in self.authors]
+                    self.authors = [_AUTHOR_MARKS_RE.sub('', a).strip() for a in self.authors]
                     self.authors = [a for a in self.authors if len(a) > 2]
                 
-                # Extract abstract (starts with "ABSTRACT" or "Abstract")
-                abstract_start = None
-                for i, line in enumerate(lines):
-                    stripped = line.strip().upper()
-                    if stripped == "ABSTRACT" or (stripped.startswith("ABSTRACT") and len(stripped) < 20):
-                        abstract_start = i + 1
-                        break
-                
                 if abstract_start is not None:
-                    abstract_lines = []
-                    # Abstract continues until introduction section
-                    for i in range(abstract_start, len(lines)):
-                        stripped = lines[i].strip()
-                        # Stop at introduction or keywords section
-                        if re.match(r'^\d+\s+(INTRODUCTION|Introduction|INTRO)', stripped) or \
-                           stripped.upper().startswith('KEY WORDS') or \
-                           stripped.upper().startswith('KEYWORDS'):
-                            break
-                        if stripped:
-                            abstract_lines.append(stripped)
                     self.abstract = " ".join(abstract_lines).strip()
                 else:
-                    # Fallback: try to find abstract section
-                    abstract_match = re.search(r'(?i)abstract[:\s]*(.+?)(?=\d+\s+(?:INTRODUCTION|Introduction|INTRO)|Keywords|Key words)', content, re.DOTALL)
-                    if abstract_match:
-                        self.abstract = abstract_match.group(1).strip()
+                    # Fallback: take the text after the first "abstract" up to the
+                    # introduction / keywords. Two forward searches instead of a lazy
+                    # DOTALL regex, which backtracks badly on long text with no end marker.
+                    abstract_match = _ABSTRACT_LABEL_RE.search(content)
+                    end_match = _ABSTRACT_END_RE.search(content, abstract_match.end() + 1) if abstract_match else None
+                    if end_match:
+                        self.abstract = content[abstract_match.end():end_match.start()].strip()
                     else:
                         self.abstract = ""
                 
-                # Extract category from keywords if available
-                keywords_match = re.search(r'(?i)(?:Keywords|Key words)[:\s]*(.+?)(?=\d+\s+(?:INTRODUCTION|Introduction|INTRO)|$)', content, re.DOTALL)
+                # Extract category from keywords if available: everything after the
+                # label up to the introduction heading, or the end of the text
+                keywords_match = _KEYWORDS_LABEL_RE.search(content)
                 if keywords_match:
-                    self.category = keywords_match.group(1).strip()[:100]  # Limit length
+                    start = keywords_match.end()
+                    end_match = _KEYWORDS_END_RE.search(content, start + 1)
+                    end = end_match.start() if end_match else len(content)
+                    self.category = content[start:end].strip()[:100]  # Limit length
 
         except Exception as e:
             print(f"Error loading {self.filepath}: {e}")
 
+        # Keyword searches are case-insensitive by default; lowercase once here
+        # instead of on every search
+        self._search_text_lower = _normalize_space(f"{self.title} {self.abstract}").lower()
+
     def word_count(self):
         return len(self.abstract.split()) if self.abstract else 0
 
@@ -216,6 +385,13 @@ class Paper:
         """
         return f"{self.title} {self.abstract}"
 
+    def get_normalized_search_text(self):
+        """
+        Get the searchable text with whitespace collapsed and lowercased.
+        Computed once when the paper is loaded.
+        """
+        return self._search_text_lower
+
     def contains_keywords(self, keywords, case_sensitive=False):
         """
         Check if the paper contains any of the specified keywords.
@@ -230,18 +406,14 @@ class Paper:
         if not keywords:
             return True
         
-        search_text = self.get_searchable_text()
-        
-        if not case_sensitive:
-            search_text = search_text.lower()
+        if case_sensitive:
+            search_text = self.get_searchable_text()
+        else:
+            search_text = self._search_text_lower
             keywords = [kw.lower() for kw in keywords]
         
         # Check if any keyword appears in the text
-        for keyword in keywords:
-            if keyword in search_text:
-                return True
-        
-        return False
+        return _any_keyword_in(search_text, _minimal_keywords(tuple(keywords)))
 
     def get_matching_keywords(self, keywords, case_sensitive=False):
         """
@@ -257,20 +429,15 @@ class Paper:
         if not keywords:
             return []
         
-        search_text = self.get_searchable_text()
-        
         if not case_sensitive:
-            search_text = search_text.lower()
+            search_text = self._search_text_lower
             keywords_lower = [kw.lower() for kw in keywords]
         else:
+            search_text = self.get_searchable_text()
             keywords_lower = keywords
         
-        matching = []
-        for i, keyword in enumerate(keywords_lower):
-            if keyword in search_text:
-                matching.append(keywords[i] if case_sensitive else keywords[i])
-        
-        return matching
+        found = _keywords_in(search_text, keywords_lower)
+        return [keywords[i] for i, keyword in enumerate(keywords_lower) if keyword in found]
 
 
 # Default astrophysics keywords
@@ -363,7 +530,7 @@ def load_all_papers(base_dir=None):
         base_dir: Base directory path. If None, uses the directory containing main.py
     
     Returns:
-        list: List of Paper objects (may contain None for missing files)
+        list: List of Paper objects (missing files are skipped)
     """
     if base_dir is None:
         base_dir = Path(__file__).resolve().parent
@@ -373,17 +540,17 @@ def load_all_papers(base_dir=None):
     # Papers are in the 'papers' subdirectory
     papers_dir = base_dir / "papers"
     
-    papers = []
+    existing_paths = []
     for i in range(1, 11):
         paper_file = papers_dir / f"paper{i}.txt"
         if paper_file.exists():
-            papers.append(Paper(paper_file))
+            existing_paths.append(paper_file)
         else:
             print(f"Warning: {paper_file} not found, skipping...")
-            papers.append(None)
     
-    # Filter out None values (missing files)
-    return [p for p in papers if p is not None]
+    # Load the papers concurrently; map() keeps them in paper1..paper10 order
+    with ThreadPoolExecutor(max_workers=min(10, os.cpu_count() or 1)) as executor:
+        return list(executor.map(Paper, existing_paths))
 
 
 if __name__ == "__main__":
@@ -3,8 +3,9 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
-from typing import Iterable, List, Sequence, Tuple
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 
 import os
 import re
@@ -20,10 +21,11 @@ try:
 
     matplotlib.use("Agg")  # headless rendering
     import matplotlib.pyplot as plt  # type: ignore[import-not-found]
+    import numpy as np  # type: ignore[import-not-found]
 except ImportError as e:
     project_dir = Path(__file__).resolve().parent
     raise SystemExit(
-        "matplotlib is required to run plots.\n\n"
+        "matplotlib and numpy are required to run plots.\n\n"
         "You are likely running the system Python (e.g. /usr/bin/python3) instead of the project's virtualenv.\n\n"
         "Run with the project venv:\n"
         f"  {project_dir}/.venv/bin/python {project_dir}/plots\n\n"
@@ -40,28 +42,43 @@ def _normalize_space(s: str) -> str:
     return re.sub(r"\s+", " ", s).strip()
 
 
+_WORD_RE = re.compile(r"\w+")
+
+
 def _paper_text(paper) -> str:
-    # `Paper` has `title` and `abstract`; we treat them as one searchable blob.
-    return _normalize_space(paper.get_searchable_text())
+    # `Paper` has `title` and `abstract`; we treat them as one searchable blob,
+    # normalized and lowercased once (at load time) so every keyword can be counted against it.
+    return paper.get_normalized_search_text()
+
+
+@lru_cache(maxsize=None)
+def _keyword_pattern(keyword: str) -> Tuple[str, Optional[re.Pattern[str]]]:
+    """
+    Normalize `keyword` once. Plain single tokens also get a compiled whole-word pattern;
+    phrases get `None` and are matched as substrings.
+    """
+    kw_norm = _normalize_space(keyword).lower()
+    if kw_norm and " " not in kw_norm and kw_norm.isalnum():
+        return kw_norm, re.compile(rf"\b{re.escape(kw_norm)}\b", re.IGNORECASE)
+    return kw_norm, None
 
 
-def _count_occurrences(text: str, keyword: str) -> int:
+def _count_occurrences(text_norm: str, keyword: str) -> int:
     """
-    Count occurrences of `keyword` in `text`.
+    Count occurrences of `keyword` in `text_norm`, which must already be
+    whitespace-normalized and lowercased (see `_paper_text`).
 
     - For single-word keywords, uses word boundaries (avoids matching inside other words).
     - For multi-word keywords (phrases), counts simple case-insensitive substring matches
       on normalized whitespace.
     """
-    text_norm = _normalize_space(text).lower()
-    kw_norm = _normalize_space(keyword).lower()
+    kw_norm, pattern = _keyword_pattern(keyword)
 
     if not kw_norm:
         return 0
 
-    if " " not in kw_norm and kw_norm.isalnum():
+    if pattern is not None:
         # Whole-word match for plain single tokens like "galaxy"
-        pattern = re.compile(rf"\b{re.escape(kw_norm)}\b", re.IGNORECASE)
         return len(pattern.findall(text_norm))
 
     # Phrase match (e.g., "black hole", "dark matter")
@@ -72,19 +89,38 @@ def _count_occurrences(text: str, keyword: str) -> int:
 class KeywordStats:
     keywords: List[str]
     paper_labels: List[str]
-    # matrix[p][k] = occurrences of keyword k in paper p (title+abstract)
-    matrix: List[List[int]]
+    # matrix[p, k] = occurrences of keyword k in paper p (title+abstract)
+    matrix: np.ndarray
 
-    def total_occurrences(self) -> List[int]:
-        return [sum(self.matrix[p][k] for p in range(len(self.matrix))) for k in range(len(self.keywords))]
+    def __post_init__(self) -> None:
+        # Also accepts a list of lists; always stored as a dense (papers x keywords) int32 array.
+        matrix = np.asarray(self.matrix, dtype=np.int32).reshape(len(self.paper_labels), len(self.keywords))
+        object.__setattr__(self, "matrix", matrix)
 
-    def papers_with_keyword(self) -> List[int]:
-        return [sum(1 for p in range(len(self.matrix)) if self.matrix[p][k] > 0) for k in range(len(self.keywords))]
+    def total_occurrences(self) -> np.ndarray:
+        return self.matrix.sum(axis=0)
+
+    def papers_with_keyword(self) -> np.ndarray:
+        return (self.matrix > 0).sum(axis=0)
 
 
 def build_keyword_stats(papers: Sequence, keywords: Sequence[str]) -> KeywordStats:
+    # Whole-word keywords (e.g. "galaxy") match exactly the `\w+` tokens equal to
+    # them, so a single token pass per paper counts all of them at once. Only
+    # phrases (e.g. "black hole", "x-ray") need their own scan.
+    word_keyword_idx: Dict[str, List[int]] = {}
+    phrase_keyword_idx: List[int] = []
+    for k, kw in enumerate(keywords):
+        kw_norm, pattern = _keyword_pattern(kw)
+        if not kw_norm:
+            continue
+        if pattern is not None:
+            word_keyword_idx.setdefault(kw_norm, []).append(k)
+        else:
+            phrase_keyword_idx.append(k)
+
     paper_labels: List[str] = []
-    matrix: List[List[int]] = []
+    rows: List[np.ndarray] = []
 
     for i, paper in enumerate(papers, start=1):
         label = f"paper{i}"
@@ -93,15 +129,30 @@ def build_keyword_stats(papers: Sequence, keywords: Sequence[str]) -> KeywordSta
             label = f"{label}: {title[:60]}{'…' if len(title) > 60 else ''}"
         paper_labels.append(label)
 
-        text = _paper_text(paper)
-        row = [_count_occurrences(text, kw) for kw in keywords]
-        matrix.append(row)
+        text_norm = _paper_text(paper)
+        row = np.zeros(len(keywords), dtype=np.int32)
+        for m in _WORD_RE.finditer(text_norm):
+            for k in word_keyword_idx.get(m.group(0), ()):
+                row[k] += 1
+        for k in phrase_keyword_idx:
+            row[k] = _count_occurrences(text_norm, keywords[k])
+        rows.append(row)
 
+    matrix = np.vstack(rows) if rows else np.zeros((0, len(keywords)), dtype=np.int32)
     return KeywordStats(keywords=list(keywords), paper_labels=paper_labels, matrix=matrix)
 
 
 def _top_n_indices(values: Sequence[int], n: int) -> List[int]:
-    return sorted(range(len(values)), key=lambda i: values[i], reverse=True)[:n]
+    values = np.asarray(values)
+    if 0 < n < values.size:
+        # O(K) partition finds the n-th largest value; only values at least that large are sorted.
+        threshold = np.partition(values, values.size - n)[values.size - n]
+        candidates = np.flatnonzero(values >= threshold)
+    else:
+        candidates = np.arange(values.size)
+    # Largest first; ties keep keyword order (same as a stable descending sort).
+    order = np.argsort(-values[candidates], kind="stable")
+    return candidates[order][:n].tolist()
 
 
 def plot_top_keywords_bar(
@@ -142,26 +193,8 @@ def plot_keyword_heatmap(
     k_idx = _top_n_indices(totals, top_n_keywords)
 
     # Build reduced matrix (binary or counts)
-    reduced = []
-    for p in range(len(stats.matrix)):
-        row = []
-        for k in k_idx:
-            v = stats.matrix[p][k]
-            row.append(1 if (use_binary_presence and v > 0) else v)
-        reduced.append(row)
-
-    # Import numpy only if we’re making the heatmap (keeps the script lightweight).
-    try:
-        import numpy as np  # type: ignore[import-not-found]
-    except ImportError as e:
-        project_dir = Path(__file__).resolve().parent
-        raise SystemExit(
-            "numpy is required for the heatmap plot.\n\n"
-            "Install it into the project venv:\n"
-            f"  {project_dir}/.venv/bin/python -m pip install numpy"
-        ) from e
-
-    data = np.array(reduced, dtype=float)
+    sub = stats.matrix[:, np.asarray(k_idx, dtype=np.intp)]
+    data = (sub > 0).astype(np.float32) if use_binary_presence else sub.astype(np.float32)
 
     plt.figure(figsize=(max(12, len(k_idx) * 0.4), max(6, len(stats.paper_labels) * 0.45)))
     im = plt.imshow(data, aspect="auto", interpolation="nearest")
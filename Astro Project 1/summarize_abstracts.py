@@ -3,6 +3,7 @@ Script to summarize abstracts of all papers using a chatbot.
 """
 
 from pathlib import Path
+import asyncio
 import os
 import time
 import json
@@ -23,7 +24,10 @@ if env_file.exists():
                     os.environ["OPENAI_API_KEY"] = value
 
 from main import load_all_papers, Paper
-from llm_units import summarize_text
+from llm_units import (
+    SUMMARY_BATCH_TOKENS, RateLimiter, close_async_client, estimate_tokens, get_async_client,
+    submit_batch_summaries_async, summarize_text_async, summarize_texts_async
+)
 
 
 def get_error_message(error):
@@ -38,7 +42,7 @@ def get_error_message(error):
     elif "429" in error_str or "insufficient_quota" in error_str.lower():
         return "Quota exceeded. Please check your OpenAI account billing and usage limits at https://platform.openai.com/account/billing"
     elif "rate_limit" in error_str.lower():
-        return "Rate limit exceeded. The script will wait and retry, or you can increase the delay between requests."
+        return "Rate limit exceeded. The script will wait and retry, or you can lower max_concurrency."
     elif "timeout" in error_str.lower():
         return "Request timed out. Please check your internet connection and try again."
     else:
@@ -57,13 +61,283 @@ def get_error_message(error):
         return error_str
 
 
-def summarize_all_abstracts(output_file="summaries.txt", delay_between_requests=1):
+def _format_summary_item(item):
+    """
+    Format one paper's summary block of the report.
+
+    Returns:
+        str: The block, ready to be written to the report file
+    """
+    status = ""
+    if 'status' in item:
+        status_icon = {'success': '✓', 'error': '✗', 'skipped': '⚠'}.get(item['status'], '')
+        status = f" [{status_icon} {item['status'].upper()}]"
+    error_details = f"Error Details: {item['error_details']}\n\n" if 'error_details' in item else ""
+    return (
+        f"{'=' * 80}\n"
+        f"PAPER {item['paper_number']}{status}\n"
+        f"{'=' * 80}\n\n"
+        f"Title: {item['title']}\n\n"
+        f"Original Abstract:\n{item['abstract']}\n\n"
+        f"Summary:\n{item['summary']}\n\n"
+        f"{error_details}"
+        "\n"
+    )
+
+
+def _load_records(records_file):
+    """
+    Read the JSONL log of a previous run.
+
+    Returns:
+        tuple: (records, truncated) where records maps each paper number to
+        its latest record, and truncated is True if the last line was cut off
+    """
+    records = {}
+    truncated = False
+    if not os.path.exists(records_file):
+        return records, truncated
+    with open(records_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            truncated = not line.endswith("\n")
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A crash mid-write can leave a partial last line
+                continue
+            records[record['paper_number']] = record
+    return records, truncated
+
+
+def _group_by_tokens(items, batch_size, max_tokens=SUMMARY_BATCH_TOKENS):
+    """
+    Split (index, paper) pairs into consecutive groups of at most `batch_size`
+    papers whose abstracts together stay within `max_tokens` estimated tokens.
+    A single abstract over the budget still gets a group of its own.
+
+    Returns:
+        list: Lists of (index, paper) pairs, in the original order
+    """
+    groups, group, group_tokens = [], [], 0
+    for item in items:
+        n_tokens = estimate_tokens(item[1].abstract)
+        if group and (len(group) >= batch_size or group_tokens + n_tokens > max_tokens):
+            groups.append(group)
+            group, group_tokens = [], 0
+        group.append(item)
+        group_tokens += n_tokens
+    if group:
+        groups.append(group)
+    return groups
+
+
+async def _summarize_papers(papers, max_concurrency, records_file, batch_size=1, client=None, use_batch_api=False,
+                            limiter=None, min_tokens_for_summary=0):
+    """
+    Summarize every paper's abstract concurrently, with at most
+    `max_concurrency` requests in flight at once. With `batch_size` > 1,
+    each request summarizes up to that many abstracts at once, fewer when
+    they would exceed SUMMARY_BATCH_TOKENS. With
+    `use_batch_api`, all abstracts go into a single OpenAI Batch API job instead.
+    Abstracts shorter than `min_tokens_for_summary` tokens are skipped.
+
+    Each result is appended to `records_file` as a JSON line as soon as it
+    arrives, so a crash part-way through keeps every summary that was
+    already paid for. Papers already summarized there (same abstract) are
+    not sent again, which makes an interrupted run resumable.
+
+    Returns:
+        tuple: (summaries, quota_exceeded) where summaries is a list of
+        result dicts in paper order
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    quota_exceeded = asyncio.Event()
+    total = len(papers)
+    previous, truncated = _load_records(records_file)
+
+    def save(item):
+        records.write(json.dumps(item, ensure_ascii=False) + "\n")
+        records.flush()
+
+    def error_items(group, e):
+        error_msg = get_error_message(e)
+        items = []
+        for i, paper in group:
+            print(f"[{i}/{total}]  ✗ Error: {error_msg}")
+            items.append({
+                'paper_number': i,
+                'title': paper.title,
+                'abstract': paper.abstract,
+                'summary': f'Error: {error_msg}',
+                'status': 'error',
+                'error_details': str(e)
+            })
+        return items
+
+    def success_item(i, paper, summary):
+        print(f"[{i}/{total}]  ✓ Summary generated successfully ({len(summary)} characters)")
+        return {
+            'paper_number': i,
+            'title': paper.title,
+            'abstract': paper.abstract,
+            'summary': summary,
+            'status': 'success'
+        }
+
+    async def summarize_group(group):
+        async with semaphore:
+            # Don't start new requests once the account is out of quota
+            if quota_exceeded.is_set():
+                return []
+
+            for i, paper in group:
+                print(f"[{i}/{total}] Generating summary for Paper {i} ({len(paper.abstract)} characters)...")
+            abstracts = [paper.abstract for _, paper in group]
+            items = []
+            try:
+                if len(abstracts) == 1:
+                    results = [await summarize_text_async(abstracts[0], client, limiter=limiter)]
+                else:
+                    results = await summarize_texts_async(abstracts, client, limiter=limiter)
+            except Exception as e:
+                if "quota" in get_error_message(e).lower() or "429" in str(e):
+                    quota_exceeded.set()
+                items = error_items(group, e)
+            else:
+                items = [success_item(i, paper, summary) for (i, paper), summary in zip(group, results)]
+
+            for item in items:
+                save(item)
+            return items
+
+    async def summarize_with_batch_api(group):
+        print(f"Submitting {len(group)} abstracts as one Batch API job; this can take a while...")
+        try:
+            results = await submit_batch_summaries_async([paper.abstract for _, paper in group])
+        except Exception as e:
+            items = error_items(group, e)
+        else:
+            items = []
+            for (i, paper), summary in zip(group, results):
+                if summary is None:
+                    items.extend(error_items([(i, paper)], RuntimeError("The batch job returned no summary")))
+                else:
+                    items.append(success_item(i, paper, summary))
+
+        for item in items:
+            save(item)
+        return items
+
+    with open(records_file, 'a', encoding='utf-8') as records:
+        if truncated:
+            records.write("\n")  # finish the partial line so new records parse
+
+        summaries = []
+        to_summarize = []
+        resumed_count = 0
+        for i, paper in enumerate(papers, 1):
+            if not paper:
+                continue
+
+            done = previous.get(i)
+            if done and done['status'] == 'success' and done['abstract'] == paper.abstract:
+                summaries.append(done)
+                resumed_count += 1
+                continue
+
+            print(f"[{i}/{total}] Paper {i}: {paper.title[:60]}...")
+
+            if not paper.abstract:
+                print(f"  ⚠️  No abstract found for this paper. Skipping.")
+                item = {
+                    'paper_number': i,
+                    'title': paper.title,
+                    'abstract': '',
+                    'summary': 'No abstract available',
+                    'status': 'skipped'
+                }
+                save(item)
+                summaries.append(item)
+                continue
+
+            n_tokens = estimate_tokens(paper.abstract)
+            if n_tokens < min_tokens_for_summary:
+                # Too short to be worth a request; the abstract already is a summary
+                print(f"  ⚠️  Abstract is only {n_tokens} tokens. Skipping.")
+                item = {
+                    'paper_number': i,
+                    'title': paper.title,
+                    'abstract': paper.abstract,
+                    'summary': 'Abstract too short to summarize',
+                    'status': 'skipped'
+                }
+                save(item)
+                summaries.append(item)
+                continue
+
+            to_summarize.append((i, paper))
+
+        if resumed_count:
+            print(f"  ↺ Reusing {resumed_count} summaries already saved in {records_file}")
+
+        if use_batch_api:
+            groups = [to_summarize] if to_summarize else []
+            run_group = summarize_with_batch_api
+        else:
+            batch_size = max(1, batch_size)
+            groups = _group_by_tokens(to_summarize, batch_size)
+            run_group = summarize_group
+
+        print()
+        # return_exceptions keeps one unexpected failure from cancelling
+        # the other groups still in flight
+        results = await asyncio.gather(*(run_group(group) for group in groups), return_exceptions=True)
+
+        for group, items in zip(groups, results):
+            if isinstance(items, Exception):
+                items = error_items(group, items)
+                for item in items:
+                    save(item)
+            elif isinstance(items, BaseException):
+                raise items
+            summaries.extend(items)
+
+    summaries.sort(key=lambda item: item['paper_number'])
+    return summaries, quota_exceeded.is_set()
+
+
+async def summarize_all_abstracts_async(output_file="summaries.txt", max_concurrency=5, batch_size=1, records_file=None,
+                                        client=None, max_connections=None, use_batch_api=False, rpm=None, tpm=None,
+                                        min_tokens_for_summary=30):
     """
     Load all papers, extract abstracts, and summarize each using the chatbot.
     
     Args:
         output_file: Path to output file where summaries will be saved
-        delay_between_requests: Seconds to wait between API requests (to avoid rate limits)
+        max_concurrency: Maximum number of API requests in flight at once (to avoid rate limits)
+        batch_size: Most abstracts per API request. Values > 1 pack several
+            abstracts into one prompt, cutting the request count; a request
+            closes early once it reaches SUMMARY_BATCH_TOKENS input tokens
+        records_file: JSONL log each result is streamed to as it completes; a
+            re-run skips papers already summarized there. Defaults to
+            `output_file` with a .jsonl suffix
+        client: AsyncOpenAI client to send requests with. If None, a shared
+            client is created and closed when done
+        max_connections: HTTP connection pool size of that shared client; raise
+            it along with max_concurrency on higher rate-limit tiers. If None,
+            uses llm_units.HTTP_MAX_CONNECTIONS
+        use_batch_api: Send every abstract in one OpenAI Batch API job instead of
+            individual requests: half the cost and no rate limits, but the job
+            can take up to 24 hours. max_concurrency, batch_size and client
+            are ignored
+        rpm, tpm: Requests and tokens per minute to stay under (your OpenAI
+            tier's limits). Requests wait for capacity instead of running
+            into 429 errors. None means no limit
+        min_tokens_for_summary: Abstracts with fewer tokens than this are
+            marked skipped instead of being sent
     """
     # Load all papers
     print("Loading papers...")
@@ -80,101 +354,48 @@ def summarize_all_abstracts(output_file="summaries.txt", delay_between_requests=
         # Show first and last few characters for verification (without exposing full key)
         print(f"✓ Using API key: {api_key[:10]}...{api_key[-10:]}\n")
     
-    summaries = []
-    success_count = 0
-    error_count = 0
-    skipped_count = 0
-    
-    # Process each paper
-    for i, paper in enumerate(papers, 1):
-        if not paper:
-            continue
-            
-        print(f"[{i}/{len(papers)}] Processing Paper {i}: {paper.title[:60]}...")
-        
-        if not paper.abstract:
-            print(f"  ⚠️  No abstract found for this paper. Skipping.\n")
-            summaries.append({
-                'paper_number': i,
-                'title': paper.title,
-                'abstract': '',
-                'summary': 'No abstract available',
-                'status': 'skipped'
-            })
-            skipped_count += 1
-            continue
-        
-        print(f"  Abstract length: {len(paper.abstract)} characters")
-        
-        try:
-            # Summarize the abstract
-            print(f"  Generating summary...")
-            summary = summarize_text(paper.abstract)
-            
-            summaries.append({
-                'paper_number': i,
-                'title': paper.title,
-                'abstract': paper.abstract,
-                'summary': summary,
-                'status': 'success'
-            })
-            
-            success_count += 1
-            print(f"  ✓ Summary generated successfully ({len(summary)} characters)\n")
-            
-            # Delay to avoid rate limits
-            if i < len(papers):
-                time.sleep(delay_between_requests)
-                
-        except Exception as e:
-            error_msg = get_error_message(e)
-            print(f"  ✗ Error: {error_msg}\n")
-            summaries.append({
-                'paper_number': i,
-                'title': paper.title,
-                'abstract': paper.abstract,
-                'summary': f'Error: {error_msg}',
-                'status': 'error',
-                'error_details': str(e)
-            })
-            error_count += 1
-            
-            # If quota error, stop processing remaining papers
-            if "quota" in error_msg.lower() or "429" in str(e):
-                print(f"\n⚠️  Quota exceeded. Stopping processing.")
-                print(f"   Processed {i}/{len(papers)} papers before stopping.")
-                break
+    if records_file is None:
+        records_file = str(Path(output_file).with_suffix(".jsonl"))
+
+    owns_client = client is None
+    if owns_client:
+        client = get_async_client(max_connections)
+    try:
+        limiter = RateLimiter(rpm, tpm) if rpm or tpm else None
+        summaries, quota_exceeded = await _summarize_papers(papers, max_concurrency, records_file, batch_size, client,
+                                                            use_batch_api, limiter, min_tokens_for_summary)
+    finally:
+        if owns_client:
+            await close_async_client()
+    success_count = sum(1 for item in summaries if item['status'] == 'success')
+    error_count = sum(1 for item in summaries if item['status'] == 'error')
+    skipped_count = sum(1 for item in summaries if item['status'] == 'skipped')
+
+    # If quota error, remaining papers were not sent
+    if quota_exceeded:
+        print(f"\n⚠️  Quota exceeded. Stopped processing.")
+        print(f"   Processed {len(summaries)}/{len(papers)} papers before stopping.")
     
     # Write summaries to file
     print(f"\n{'='*80}")
     print("Writing summaries to file...")
     print(f"{'='*80}\n")
     
+    # Build the whole report and write it in one call
+    chunks = [
+        "=" * 80 + "\n"
+        "PAPER ABSTRACT SUMMARIES\n"
+        + "=" * 80 + "\n\n"
+        f"Generated: {time.strftime('%Y-%m-%d %H:%M:%S')}\n"
+        f"Total papers: {len(summaries)}\n"
+        f"Successful summaries: {success_count}\n"
+        f"Errors: {error_count}\n"
+        f"Skipped (no or too-short abstract): {skipped_count}\n"
+        "\n" + "=" * 80 + "\n\n"
+    ]
+    chunks.extend(_format_summary_item(item) for item in summaries)
     with open(output_file, 'w', encoding='utf-8') as f:
-        f.write("=" * 80 + "\n")
-        f.write("PAPER ABSTRACT SUMMARIES\n")
-        f.write("=" * 80 + "\n\n")
-        f.write(f"Generated: {time.strftime('%Y-%m-%d %H:%M:%S')}\n")
-        f.write(f"Total papers: {len(summaries)}\n")
-        f.write(f"Successful summaries: {success_count}\n")
-        f.write(f"Errors: {error_count}\n")
-        f.write(f"Skipped (no abstract): {skipped_count}\n")
-        f.write("\n" + "=" * 80 + "\n\n")
-        
-        for item in summaries:
-            f.write(f"{'=' * 80}\n")
-            f.write(f"PAPER {item['paper_number']}")
-            if 'status' in item:
-                status_icon = {'success': '✓', 'error': '✗', 'skipped': '⚠'}.get(item['status'], '')
-                f.write(f" [{status_icon} {item['status'].upper()}]")
-            f.write(f"\n")
-            f.write(f"{'=' * 80}\n\n")
-            f.write(f"Title: {item['title']}\n\n")
-            f.write(f"Original Abstract:\n{item['abstract']}\n\n")
-            f.write(f"Summary:\n{item['summary']}\n\n")
-            if 'error_details' in item:
-                f.write(f"Error Details: {item['error_details']}\n\n")
-            f.write("\n")
+        f.write("".join(chunks))
     
     # Print summary statistics
     print(f"✓ Summaries saved to {output_file}\n")
@@ -184,11 +405,11 @@ def summarize_all_abstracts(output_file="summaries.txt", delay_between_requests=
     print(f"Total papers processed: {len(summaries)}")
     print(f"  ✓ Successful summaries: {success_count}")
     print(f"  ✗ Errors: {error_count}")
-    print(f"  ⚠  Skipped (no abstract): {skipped_count}")
+    print(f"  ⚠  Skipped (no or too-short abstract): {skipped_count}")
     
     if error_count > 0:
         print(f"\n⚠️  Some papers failed to summarize. Check the output file for details.")
-        if "quota" in str(summaries[-1].get('error_details', '')).lower():
+        if any("quota" in item.get('error_details', '').lower() for item in summaries):
             print(f"💡 Tip: Your OpenAI account quota has been exceeded.")
             print(f"   Please check billing at: https://platform.openai.com/account/billing")
     
@@ -196,6 +417,16 @@ def summarize_all_abstracts(output_file="summaries.txt", delay_between_requests=
         print(f"\n✓ Successfully generated {success_count} summaries!")
 
 
+def summarize_all_abstracts(output_file="summaries.txt", max_concurrency=5, batch_size=1, records_file=None,
+                            max_connections=None, use_batch_api=False, rpm=None, tpm=None, min_tokens_for_summary=30):
+    """
+    Synchronous entry point: runs summarize_all_abstracts_async in a new event loop.
+    """
+    asyncio.run(summarize_all_abstracts_async(output_file, max_concurrency, batch_size, records_file,
+                                              max_connections=max_connections, use_batch_api=use_batch_api,
+                                              rpm=rpm, tpm=tpm, min_tokens_for_summary=min_tokens_for_summary))
+
+
 if __name__ == "__main__":
     # Run the summarization
     summarize_all_abstracts()
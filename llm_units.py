@@ -1,15 +1,102 @@
 from openai import OpenAI
+from functools import wraps
+from pathlib import Path
+import hashlib
+import inspect
 import os
+import ssl
+import tempfile
 
-client = OpenAI()
+import httpx
 
-def summarize_text(text):
-    response = client.chat.completions.create(
+# Building an SSL context is most of the cost of creating a client, so every
+# client shares this one.
+_shared_ssl = ssl.create_default_context()
+# Keep connections alive between calls so each request skips the TCP+TLS handshake
+_HTTP_LIMITS = httpx.Limits(max_connections=256, max_keepalive_connections=128, keepalive_expiry=30.0)
+# Applied by the OpenAI client to every request (a client-level timeout replaces
+# the httpx one, so this is the only place it is set)
+REQUEST_TIMEOUT = httpx.Timeout(30.0, connect=10.0)
+_clients = {}
+
+# Replies are cached on disk, one file per request; delete the directory to invalidate
+CACHE_DIR = Path(__file__).resolve().parent / ".cache"
+# Replies disk_cached keeps in memory per function, in front of CACHE_DIR
+MEMO_SIZE = 4096
+
+SYSTEM_PROMPT = "You are a scientific research assistant."
+SUMMARY_PROMPT = "Summarize this research abstract clearly:\n\n{text}"
+
+def _get_api_key():
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise ValueError("OPENAI_API_KEY environment variable not set")
+    return api_key
+
+def get_sync_client():
+    """Return the OpenAI client for the current OPENAI_API_KEY, creating it on first use."""
+    api_key = _get_api_key()
+    client = _clients.get(api_key)
+    if client is None:
+        http_client = httpx.Client(verify=_shared_ssl, limits=_HTTP_LIMITS)
+        # No retry decorator in this module: the SDK's own retries (429s,
+        # honouring Retry-After, plus connection errors and 5xx) are the only layer
+        client = OpenAI(api_key=api_key, http_client=http_client, timeout=REQUEST_TIMEOUT, max_retries=3)
+        _clients[api_key] = client
+    return client
+
+def disk_cached(kind, model, *prompts):
+    """
+    Memoize a text -> reply API call in memory and in CACHE_DIR/<kind>/, keyed
+    on the model, the prompts the call sends, the text and any other arguments,
+    so reruns and duplicate abstracts don't pay for the same request twice and
+    editing a prompt doesn't return replies to the old one.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+        # In-memory layer in front of the disk; holds replies only, never None
+        memo = {}
+
+        @wraps(func)
+        def wrapper(text, *args, **kwargs):
+            # Bind with defaults filled in, so f(t), f(t, 400) and
+            # f(t, max_tokens=400) share one key
+            bound = signature.bind(text, *args, **kwargs)
+            bound.apply_defaults()
+            options = list(bound.arguments.items())[1:]
+            key = "\n".join((model, *prompts, text, repr(options)))
+            if key in memo:
+                return memo[key]
+            path = CACHE_DIR / kind / hashlib.sha256(key.encode("utf-8")).hexdigest()
+            if path.exists():
+                reply = path.read_text(encoding="utf-8")
+            else:
+                reply = func(*bound.args, **bound.kwargs)
+                if reply is None:
+                    return None
+                path.parent.mkdir(parents=True, exist_ok=True)
+                # Write to a temp file and rename it into place, so an interrupted
+                # run never leaves a truncated reply behind to be read as a hit
+                with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=path.parent, delete=False) as tmp:
+                    tmp.write(reply)
+                os.replace(tmp.name, path)
+            if len(memo) >= MEMO_SIZE:
+                # Evict the oldest entry; the disk copy stays
+                del memo[next(iter(memo))]
+            memo[key] = reply
+            return reply
+        return wrapper
+    return decorator
+
+@disk_cached("summaries", "gpt-4o-mini", SYSTEM_PROMPT, SUMMARY_PROMPT)
+def summarize_text(text, max_tokens=400):
+    response = get_sync_client().chat.completions.create(
         model="gpt-4o-mini",
         messages=[
-            {"role": "system", "content": "You are a scientific research assistant."},
-            {"role": "user", "content": f"Summarize this research abstract clearly:\n\n{text}"}
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": SUMMARY_PROMPT.format(text=text)}
         ],
         temperature=0.3,
+        max_tokens=max_tokens,
     )
-    return response.choices[0].message.content  
\ No newline at end of file
+    return response.choices[0].message.content  
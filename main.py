@@ -1,27 +1,71 @@
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import os
+import tempfile
+
+try:
+    import pypdfium2 as pdfium  # PDFium (C++): several times faster than PyPDF2
+except ImportError:
+    pdfium = None
 
-from PyPDF2 import PdfReader
-from openai import OpenAI
+try:
+    from PyPDF2 import PdfReader
+except ImportError:
+    PdfReader = None
 
 def convert_pdf_to_txt_file(pdf_path, output_path):
     """
     Convert a PDF file into a text file.
     """
+    if pdfium is None and PdfReader is None:
+        print("Error: no PDF library is installed. Please install one with: pip install pypdfium2")
+        return
+    pdf = None
+    tmp_path = None
     try:
-        reader = PdfReader(str(pdf_path))
-        text = ""
-        for page in reader.pages:
-            text += (page.extract_text() or "") + "\n"
-        with open(output_path, "w", encoding="utf-8") as f:
-            f.write(text)
+        # Open the PDF before creating any output, so an unreadable file
+        # fails without touching abstracts/txt
+        if pdfium is not None:
+            pdf = pdfium.PdfDocument(str(pdf_path))
+        else:
+            reader = PdfReader(str(pdf_path))
+        # Write each page as it is extracted so peak memory is one page, not
+        # the whole document. The pages go to a temp file that replaces the
+        # output only once it is complete, so a failure part-way through never
+        # leaves a partial .txt to be loaded as a paper.
+        with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=Path(output_path).parent,
+                                         suffix=".tmp", delete=False) as f:
+            tmp_path = f.name
+            if pdf is not None:
+                for page in pdf:
+                    textpage = page.get_textpage()
+                    f.write(textpage.get_text_range())
+                    f.write("\n")
+                    # Free PDFium's per-page buffers right away
+                    textpage.close()
+                    page.close()
+            else:
+                for page in reader.pages:
+                    f.write(page.extract_text() or "")
+                    f.write("\n")
+        os.replace(tmp_path, output_path)
         print(f"Converted: {pdf_path} -> {output_path}")
     except Exception as e:
+        if tmp_path is not None and os.path.exists(tmp_path):
+            os.unlink(tmp_path)
         print(f"Error converting {pdf_path}: {e}")
+    finally:
+        if pdf is not None:
+            pdf.close()
+def _convert_one(task):
+    """Unpack a (pdf_path, output_path) task for ProcessPoolExecutor.map."""
+    return convert_pdf_to_txt_file(*task)
 def convert_all_pdfs():
     base_dir = Path(__file__).resolve().parent
     pdf_folder = base_dir / "abstracts" / "pdfs"
     txt_folder = base_dir / "abstracts" / "txt"
     txt_folder.mkdir(parents=True, exist_ok=True)
+    tasks = []
     for pdf_path in sorted(pdf_folder.glob("*.pdf")):
         if pdf_path.is_file():
             filename = pdf_path.name
@@ -29,15 +73,25 @@ def convert_all_pdfs():
             txt_filename = filename.replace(".pdf", ".txt")
             output_path = txt_folder / txt_filename
 
-            convert_pdf_to_txt_file(pdf_path, output_path)
-if __name__ == "__main__":
-    convert_all_pdfs()
-    print("Program is running!")
-import os
+            tasks.append((pdf_path, output_path))
+    if not tasks:
+        return
+    # Extraction is CPU-bound pure Python, so use processes rather than threads
+    ncpu = os.cpu_count() or 1
+    with ProcessPoolExecutor() as executor:
+        list(executor.map(_convert_one, tasks, chunksize=max(1, len(tasks) // (4 * ncpu))))
 from collections import Counter
+from functools import cached_property
+from itertools import chain
 import numpy as np
+import matplotlib
+matplotlib.use("Agg")  # plots are saved to files; no GUI backend needed
 import matplotlib.pyplot as plt
 
+from llm_units import REQUEST_TIMEOUT, disk_cached, get_sync_client, summarize_text
+
+HEADER_PREFIXES = ("Title:", "Authors:", "Category:", "Abstract:")
+
 class Paper:
     """
     Represents one arXiv paper.
@@ -50,55 +104,54 @@ class Paper:
         self.authors = []
         self.category = ""
         self.abstract = ""
+        self._words = []
 
         self.load_paper()
 
     
     def load_paper(self):
-        """Reads file and extracts metadata."""
+        """Reads file and extracts metadata in a single pass."""
         try:
             with open(self.filepath, 'r', encoding="utf-8") as f:
-                content = f.read()
-
-            lines = content.split("\n")
+                for line in f:
+                    # Headers may be indented, as in the labeled files' other parser
+                    line = line.lstrip()
+                    if not line.startswith(HEADER_PREFIXES):
+                        continue
 
-            for line in lines:
-                line = line.strip()
+                    if line.startswith("Title:"):
+                        self.title = line.replace("Title:", "").strip()
 
-                if line.startswith("Title:"):
-                    self.title = line.replace("Title:", "").strip()
-
-                elif line.startswith("Authors:"):
-                   authors_str = line.replace("Authors:", "").strip()
-                   self.authors = [a.strip() for a in authors_str.split(",")]
-                elif line.startswith("Category:"):
-                    self.category = line.replace("Category:", "").strip()
- 
-                if "Abstract:" in content:
-                    self.abstract = content.split("Abstract:", 1)[1].strip()
+                    elif line.startswith("Authors:"):
+                        authors_str = line.replace("Authors:", "").strip()
+                        self.authors = [a.strip() for a in authors_str.split(",")]
+                    elif line.startswith("Category:"):
+                        self.category = line.replace("Category:", "").strip()
+                    else:
+                        # The abstract runs to the end of the file
+                        self.abstract = (line[len("Abstract:"):] + f.read()).strip()
+                        break
                 else:
-                    print("Abstract not found.") 
-            
+                    print("Abstract not found.")
+
         except Exception as e:
             print(f"Error loading {self.filepath}: {e}")
 
+        # Tokenize once; the statistics below are all built from this
+        self._words = self.abstract.lower().split()
+
+    # Cached: the archive statistics and plots ask for these repeatedly
+    @cached_property
     def word_count(self):
-        return len(self.abstract.split())
+        return len(self._words)
 
+    @cached_property
     def author_count(self):
         return len(self.authors)
 
+    @cached_property
     def keyword_frequency(self):
-        words = self.abstract.lower().split()
-        return Counter(words)
-
-# TEST PAPER
-test_paper = Paper("abstracts/txt/paper1.txt")
-print(f"Filepath:", test_paper.filepath)
-print(f"Title:", test_paper.title)
-print(f"Authors:", test_paper.authors)
-print(f"Category:", test_paper.category)
-print(f"Abstract:", test_paper.abstract)
+        return Counter(self._words)
 
 class Archive:
     """
@@ -109,97 +162,80 @@ class Archive:
         self.papers = []
         self.load_papers()
     def load_papers(self):
-        for filename in os.listdir(self.folder_path):
-            if filename.endswith(".txt"):
-                path = os.path.join(self.folder_path, filename)
-                paper = Paper(path)
-                self.papers.append(paper)
+        # scandir returns the file type with each entry, so no extra stat calls
+        paths = [entry.path for entry in os.scandir(self.folder_path)
+                 if entry.name.endswith(".txt") and entry.is_file()]
+        # Loading is mostly file IO, so threads overlap it well
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            self.papers = list(executor.map(Paper, paths))
+        # Build the per-paper counts once as arrays, for the stats and plots
+        n = len(self.papers)
+        self._word_counts = np.fromiter((p.word_count for p in self.papers), dtype=np.int32, count=n)
+        self._author_counts = np.fromiter((p.author_count for p in self.papers), dtype=np.int32, count=n)
     def average_word_count(self):
-        counts = [paper.word_count() for paper in self.papers]
-        return np.mean(counts) 
+        return self._word_counts.mean()
+    def average_author_count(self):
+        return self._author_counts.mean()
+    def most_common_words(self, n=10):
+        # One Counter over every token, not a Counter per paper merged together
+        all_words = Counter(chain.from_iterable(paper._words for paper in self.papers))
+        return all_words.most_common(n)
     def category_counts(self):
-        categories = [paper.category for paper in self.paper]
+        categories = [paper.category for paper in self.papers]
         return Counter(categories)
+    def plot_stats(self, outpath="stats.png"):
+        """Save the word-count histogram and authors-per-paper bar chart as one figure."""
+        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 4))
+        ax1.hist(self._word_counts, bins="auto")
+        ax1.set_title("Distribution of Abstract Word Counts")
+        ax1.set_xlabel("Word Count")
+        ax1.set_ylabel("Number of Papers")
+        ax2.bar(np.arange(len(self._author_counts)), self._author_counts)
+        ax2.set_title("Number of Authors per Paper")
+        ax2.set_xlabel("Paper Index")
+        ax2.set_ylabel("Author Count")
+        fig.tight_layout()
+        fig.savefig(outpath, dpi=100)
+        plt.close(fig)
 
-archive = Archive("abstracts")
-print("Total papers:", len(archive.papers))
-print("Average word count:", archive.average_word_count())
-print("category distribution:", archive.categroy_counts())
-
-import numpy as np
-def average_word_count(self):
-    counts = [paper.word_count() for paper in self.papers]
-    return np.mean(counts)
-def average_author_count(self):
-    counts = [paper.author_count() for paper in self.papers]
-    return np.mean(counts)
-
-from collections import Counter
-def most_common_words(self, n=10):
-    all_words = Counter()
-    for paper in self.papers:
-        all_words.update(paper.keyword_frequency())
-    return all_words.most_common(n)
-
-archive = Archive("abstracts/txt")
-print("Total papers:", len(archive.papers))
-print("Average abstract length:", archive.average_word_count())
-print("Average author count:", archive.average_author_count())
-print("Most common words:", archive.most_common_words(10))
-
-import matplotlib.pyplot as plt
-word_counts = [paper.word_count() for paper in archive.papers]
-plt.hist(word_counts)
-plt.title("Distribution of Abstract Word Counts")
-plt.xlabel("Word Count")
-plt.ylabel("Number of Papers")
-plt.show()
-
-author_counts = [paper.author_count() for paper in archive.papers]
-plt.bar(range(len(author_counts)), author_counts)
-plt.title("Number of Authors per Paper")
-plt.xlabel("Paper Index")
-plt.ylabel("Author Count")
-plt.show()
-    
-from llm_units import summarize_text
-archive = Archive("abstracts/txt")
-for paper in archive.papers:
-    summary = summarize_text(paper.abstract)
-    print("\n--- AI Summary ---")
-    print(summary)
-
-client = OpenAI
+THEME_PROMPT = "Classify the research topic in one short phrase."
 
-def detect_theme(text):
-    response = client.chat.completions.create(
+@disk_cached("themes", "gpt-4o-mini", THEME_PROMPT)
+def detect_theme(text, max_tokens=32):
+    response = get_sync_client().chat.completions.create(
         model="gpt-4o-mini",
         messages=[
-            {"role": "system", "content": "Classify the research topic in one short phrase."},
+            {"role": "system", "content": THEME_PROMPT},
             {"role": "user", "content": text}
         ],
+        max_tokens=max_tokens,
     )
     return response.choices[0].message.content
  
-def compare_papers(text1, text2):
-    prompt = f"""
+COMPARE_PROMPT = """
     Compare these two research abstracts.
     Highlight similarities and differences.
 
     Paper 1:
-    {text}
+    {text1}
 
     Paper 2:
-    {text}
+    {text2}
     """
-    response = client.chat.completions.create(
+
+def compare_papers(text1, text2, max_tokens=600, max_chars=4000):
+    # Truncate so two long inputs can't overflow the context window
+    prompt = COMPARE_PROMPT.format(text1=text1[:max_chars], text2=text2[:max_chars])
+    response = get_sync_client().chat.completions.create(
         model="gpt-4o-mini",
         messages=[{"role": "user", "content": prompt}],
+        max_tokens=max_tokens,
+        timeout=REQUEST_TIMEOUT,
     )
     return response.choices[0].message.content
 
     combined = "\n\n".join([p.abstract for p in archive.papers])
-    response = client.chat.completions.create(
+    response = get_sync_client().chat.completions.create(
         model="gpt-4o-mini",
         messages=[
             {"role": "system", "content": "You answer questions based only on the provided research abstracts."},
@@ -207,6 +243,37 @@ def compare_papers(text1, text2):
         ],
     )
 
-    
 
-    
+def demo():
+    """Print a test paper, the archive statistics and an AI summary of every paper."""
+    # TEST PAPER
+    test_paper = Paper("abstracts/txt/paper1.txt")
+    print(f"Filepath:", test_paper.filepath)
+    print(f"Title:", test_paper.title)
+    print(f"Authors:", test_paper.authors)
+    print(f"Category:", test_paper.category)
+    print(f"Abstract:", test_paper.abstract)
+
+    archive = Archive("abstracts")
+    print("Total papers:", len(archive.papers))
+    print("Average word count:", archive.average_word_count())
+    print("category distribution:", archive.category_counts())
+
+    archive = Archive("abstracts/txt")
+    print("Total papers:", len(archive.papers))
+    print("Average abstract length:", archive.average_word_count())
+    print("Average author count:", archive.average_author_count())
+    print("Most common words:", archive.most_common_words(10))
+
+    archive.plot_stats("stats.png")
+
+    for paper in archive.papers:
+        summary = summarize_text(paper.abstract)
+        print("\n--- AI Summary ---")
+        print(summary)
+
+
+if __name__ == "__main__":
+    convert_all_pdfs()
+    print("Program is running!")
+    demo()